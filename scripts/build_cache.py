@@ -0,0 +1,28 @@
+"""
+Build the prebuilt parquet cache for the GCS dashboard.
+
+Runs the shard ETL once and writes the prepared frames to
+gs://<bucket>/final_project/data/cache/ so the app's load_data_gcs can
+skip the ETL on cold start. Run after each process_data.py upload:
+
+python scripts/build_cache.py --bucket_name <bucket>
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from plots import write_cache
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build the dashboard parquet cache in GCS')
+    parser.add_argument('--bucket_name', type=str, default=os.environ.get('BUCKET_NAME'),
+                        required=False, help='GCS bucket holding the processed data')
+    parser.add_argument('--countries_path', type=str, default='./data/countries.csv',
+                        required=False, help='Path to the ISO 3166 countries.csv')
+
+    args = parser.parse_args(sys.argv[1:])
+
+    write_cache(args.bucket_name, args.countries_path)
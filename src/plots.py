@@ -0,0 +1,522 @@
+"""
+Shared data loading and plotting for the Streamlit dashboards.
+
+src/streamlit_app_V2.py (local files) and
+deployment/src/streamlit_app_V2_1.py (GCS) render the same dashboard;
+this module holds the single implementation both import so every
+optimization lands once instead of drifting between the two copies.
+"""
+
+import glob
+import io
+import json
+import os
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+# known shard schemas: an explicit dtype map skips the read_csv dtype
+# sniffer, and float32 counts halve the bytes every downstream scan moves
+COVID_DTYPES = {
+    'year_month': 'category', 'Country_Region': 'category',
+    'Confirmed_cumulative': 'float32', 'Deaths_cumulative': 'float32',
+    'Recovered_cumulative': 'float32', 'Active_cumulative': 'float32',
+}
+FLIGHT_DTYPES = {
+    'year_month': 'category', 'destination_country': 'category',
+    'destination_country_code': 'category', 'origin_country': 'category',
+    'origin_country_code': 'category', 'flight_count': 'float32',
+}
+
+# cheap DataFrame fingerprint for st.cache_data: shape, columns and a
+# summed row hash instead of Streamlit's deep content hashing
+_DF_HASH = {pd.DataFrame: lambda df: (df.shape, tuple(df.columns),
+                                      pd.util.hash_pandas_object(df, index=True).sum())}
+
+# shard groups the loaders resolve, either via glob or via manifest.json
+SHARD_PATTERNS = {
+    'covid_all': 'covid_*_all.csv',
+    'covid_US': 'covid_*_US.csv',
+    'flights': 'flight_*_US.csv',
+}
+
+
+@st.cache_data(show_spinner=False)
+def _load_iso_countries(countries_path):
+    """
+    Static ISO 3166 lookup from countries.csv: Alpha-2 -> Alpha-3 for
+    choropleth locations and Alpha-3 -> English name for hover labels.
+    """
+    iso = pd.read_csv(countries_path,
+                      usecols=['English short name lower case', 'Alpha-2 code', 'Alpha-3 code'])
+    a2_to_a3 = iso.set_index('Alpha-2 code')['Alpha-3 code']
+    a3_to_name = iso.set_index('Alpha-3 code')['English short name lower case']
+    return a2_to_a3, a3_to_name
+
+
+def _union_month_dtype(*columns):
+    """
+    One ordered categorical dtype covering every month seen in any of the
+    given columns. All month columns must share it: tab 2 slices the covid
+    frame with months taken from the flight frames, and a month that is
+    not a category of the target index breaks the .loc slice.
+    """
+    months = sorted(set().union(*(c.dropna().unique() for c in columns)))
+    return pd.CategoricalDtype(months, ordered=True)
+
+
+def _parse_combined(blobs, usecols=None, dtype=None):
+    """
+    Glue raw CSV shard bytes together, keeping only the first shard's
+    header, and parse the combined buffer with a single read_csv. Parsing
+    once avoids re-initializing the CSV parser per shard and the extra
+    copy a list-of-frames concat would make; the pyarrow engine parses
+    with multiple threads.
+    """
+    buf = io.BytesIO()
+    for i, data in enumerate(blobs):
+        if i > 0:
+            data = data[data.index(b'\n') + 1:]  # strip header
+        buf.write(data)
+    buf.seek(0)
+    return pd.read_csv(buf, engine='pyarrow', usecols=usecols, dtype=dtype)
+
+
+def _prepare_frames(read, countries_path):
+    """
+    Shared ETL turning the processed shards into the dashboard frames.
+
+    Args:
+        read (callable): read(group, usecols=None, dtype=None) -> DataFrame
+            that resolves a SHARD_PATTERNS group and parses the matches
+        countries_path (str): path to the ISO 3166 countries.csv
+
+    Returns:
+        tuple: df_US, df_end, df_covid_month, df_covid_month_US, df_end2,
+            flight_cum, max_flights, max_cases
+    """
+    stats = ['Confirmed_cumulative', 'Deaths_cumulative', 'Recovered_cumulative', 'Active_cumulative']
+    key = ['year_month', 'Country_Region']
+    df_covid_month = read('covid_all', usecols=key + stats, dtype=COVID_DTYPES)
+    df_covid_month_US = read('covid_US', usecols=key + stats, dtype=COVID_DTYPES)
+    df_end2 = read('flights', dtype=FLIGHT_DTYPES)
+    # categorical keys: group hashing on int codes instead of Python strings;
+    # year_month is made ordered so the range filters below still work, and
+    # every frame shares the same union dtype so months picked from one
+    # frame can slice any of the others
+    month_dtype = _union_month_dtype(df_covid_month['year_month'],
+                                     df_covid_month_US['year_month'],
+                                     df_end2['year_month'])
+    for df in (df_covid_month, df_covid_month_US, df_end2):
+        df['year_month'] = df['year_month'].astype(month_dtype)
+    # combine same month and country
+    df_covid_month[stats] = df_covid_month[stats].fillna(0)
+    df_covid_month = df_covid_month.groupby(key, sort=False, observed=True, as_index=False)[stats].sum()
+    df_covid_month_US = df_covid_month_US.groupby(key, sort=False, observed=True, as_index=False)[stats].sum()
+    # recalculate monthly change: one grouped diff emits all four columns.
+    # diff only needs months ascending within each country, so a stable
+    # single-key sort on year_month is enough — no two-key lexsort
+    new_cols = [stat.replace('_cumulative', '_monthly_new') for stat in stats]
+    df_covid_month.sort_values('year_month', inplace=True, kind='stable')
+    df_covid_month[new_cols] = df_covid_month.groupby('Country_Region', sort=False, observed=True)[stats].diff()
+    df_covid_month_US.sort_values('year_month', inplace=True, kind='stable')
+    df_covid_month_US[new_cols] = df_covid_month_US.groupby('Country_Region', sort=False, observed=True)[stats].diff()
+
+    key = ['year_month', 'destination_country', 'destination_country_code', 'origin_country', 'origin_country_code']
+    df_end2['flight_count'] = df_end2['flight_count'].fillna(0)
+    df_end2 = df_end2.groupby(key, sort=False, observed=True, as_index=False)['flight_count'].sum()
+    df_end = df_end2.groupby(key[:3], sort=False, observed=True, as_index=False)['flight_count'].sum()
+
+    # in-place renames/drops: these would otherwise each copy every block
+    df_covid_month.rename(columns={'Country_Region': 'country', 'year_month': 'month'}, inplace=True)
+    df_covid_month_US.rename(columns={'Country_Region': 'country', 'year_month': 'month'}, inplace=True)
+    df_end2.rename(columns={'destination_country': 'end_country', 'year_month': 'month'}, inplace=True)
+    df_end.rename(columns={'destination_country': 'end_country', 'year_month': 'month'}, inplace=True)
+    df_end.drop(columns=['destination_country_code'], inplace=True)
+
+    # attach per-month US-bound flight totals with a map lookup; the old
+    # merge joined against every destination-country row and then threw
+    # the join column away
+    flights_per_month = df_end.groupby('month', observed=True, sort=False)['flight_count'].sum()
+    df_US = df_covid_month_US.copy()
+    df_US['flight_count'] = df_US['month'].map(flights_per_month).fillna(0)
+
+    # keep the stat columns wide: consumers pick a column by name, so the
+    # long-form melt would only multiply the row count by the stat count
+
+    # cumulative per-origin pivot: the flight total for any [start, end]
+    # range is then cum[end] - cum[start-1], two row lookups instead of a
+    # full-frame groupby on every slider move; keyed by ISO-3 code so the
+    # choropleth can skip client-side country-name matching
+    flight_cum = df_end2.pivot_table(index='month', columns='origin_country_code',
+                                     values='flight_count', aggfunc='sum',
+                                     fill_value=0, observed=True).sort_index().cumsum()
+    a2_to_a3, _ = _load_iso_countries(countries_path)
+    flight_cum.columns = flight_cum.columns.map(a2_to_a3)
+    flight_cum = flight_cum.loc[:, flight_cum.columns.notna()]
+
+    # index the frames by month so the slider filters become sorted-index
+    # slices (searchsorted) instead of full boolean scans per rerun
+    for df in (df_US, df_end2, df_covid_month):
+        df.sort_values('month', inplace=True, kind='stable')
+        df.set_index('month', inplace=True)
+    # df_end keeps month as a column (the tab-2 slider reads it) but is
+    # month-sorted too so .unique() comes back already ordered
+    df_end.sort_values('month', inplace=True, kind='stable')
+
+    # color-scale bounds are global constants, independent of the slider
+    # range; compute them once here instead of on every map redraw
+    max_flights = flight_cum.iloc[-1].max()
+    max_cases = df_covid_month['Confirmed_monthly_new'].max()
+
+    return df_US, df_end, df_covid_month, df_covid_month_US, df_end2, flight_cum, max_flights, max_cases
+
+
+# frames persisted by write_cache; the two scalar color-scale bounds are
+# cheap to rederive on load, so only the frames are stored
+CACHE_NAMES = ('df_US', 'df_end', 'df_covid_month', 'df_covid_month_US', 'df_end2', 'flight_cum')
+
+
+def _gcs_fs():
+    """fsspec filesystem for the configured GCS connection."""
+    from st_files_connection import FilesConnection
+    conn = st.connection("gcs", type=FilesConnection)
+    return conn.fs
+
+
+def _load_shards_gcs(fs, bucket_name, countries_path):
+    """Run the shard ETL against GCS (cold path when no cache exists)."""
+    prefix = f'gs://{bucket_name}/final_project/data/processed_data'
+    # a manifest.json written by build_cache.py replaces three prefix-scan
+    # list operations with a single small object get
+    try:
+        manifest = json.loads(fs.cat_file(f'{prefix}/manifest.json'))
+    except FileNotFoundError:
+        manifest = None
+
+    def read(group, usecols=None, dtype=None):
+        if manifest is None:
+            paths = sorted(fs.glob(f'{prefix}/{SHARD_PATTERNS[group]}'))
+        else:
+            paths = manifest[group]
+        # one fs.cat call downloads every shard concurrently
+        blobs = fs.cat(paths)
+        return _parse_combined((data for _, data in sorted(blobs.items())), usecols, dtype)
+
+    return _prepare_frames(read, countries_path)
+
+
+def write_cache(bucket_name, countries_path):
+    """
+    Run the shard ETL once and persist the prepared frames as parquet under
+    gs://<bucket>/final_project/data/cache/, so dashboard cold starts become
+    a handful of parquet reads instead of the full ETL. Invoked offline by
+    scripts/build_cache.py after each process_data.py run.
+    """
+    fs = _gcs_fs()
+    # refresh the shard manifest so the app's cold path needs no globs
+    prefix = f'gs://{bucket_name}/final_project/data/processed_data'
+    manifest = {group: sorted(fs.glob(f'{prefix}/{pattern}'))
+                for group, pattern in SHARD_PATTERNS.items()}
+    with fs.open(f'{prefix}/manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    frames = _load_shards_gcs(fs, bucket_name, countries_path)
+    for name, df in zip(CACHE_NAMES, frames):
+        with fs.open(f'gs://{bucket_name}/final_project/data/cache/{name}.parquet', 'wb') as f:
+            df.to_parquet(f, engine='pyarrow', compression='zstd')
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading data...")
+def load_data_gcs(bucket_name, countries_path):
+    """
+    Load and prepare the dashboard data from GCS.
+    Prefers the prebuilt parquet cache published by scripts/build_cache.py
+    and falls back to the shard ETL when none exists. Cached so widget
+    interactions reuse the prepared DataFrames instead of re-downloading
+    everything from GCS on each rerun; the ttl makes a long-lived server
+    pick up refreshed files hourly.
+
+    Args:
+        bucket_name (str): GCS bucket holding the processed shards
+        countries_path (str): path to the ISO 3166 countries.csv
+
+    Returns:
+        tuple: the prepared frames (see _prepare_frames)
+    """
+    fs = _gcs_fs()
+    cache = f'gs://{bucket_name}/final_project/data/cache'
+    if fs.exists(f'{cache}/{CACHE_NAMES[0]}.parquet'):
+        frames = []
+        for name in CACHE_NAMES:
+            with fs.open(f'{cache}/{name}.parquet', 'rb') as f:
+                frames.append(pd.read_parquet(f, engine='pyarrow'))
+        df_US, df_end, df_covid_month, df_covid_month_US, df_end2, flight_cum = frames
+        max_flights = flight_cum.iloc[-1].max()
+        max_cases = df_covid_month['Confirmed_monthly_new'].max()
+        return df_US, df_end, df_covid_month, df_covid_month_US, df_end2, flight_cum, max_flights, max_cases
+    return _load_shards_gcs(fs, bucket_name, countries_path)
+
+
+@st.cache_data(ttl=3600, show_spinner="Loading data...")
+def load_data_local(data_path):
+    """
+    Load and prepare the dashboard data from a local data directory.
+
+    Args:
+        data_path (str): path to the data directory holding processed_data/
+
+    Returns:
+        tuple: the prepared frames (see _prepare_frames)
+    """
+    def read(group, usecols=None, dtype=None):
+        blobs = []
+        for path in sorted(glob.glob(f'{data_path}/processed_data/{SHARD_PATTERNS[group]}')):
+            with open(path, 'rb') as f:
+                blobs.append(f.read())
+        return _parse_combined(blobs, usecols, dtype)
+
+    return _prepare_frames(read, os.path.join(data_path, 'countries.csv'))
+
+
+@st.cache_data(ttl=3600, show_spinner=False, hash_funcs=_DF_HASH)
+def filter_us(df_US, start_date, end_date):
+    """
+    Slice the US frame to the selected month range, cached on the range so
+    the plot and the correlation share one filter per interaction. The
+    cheap fingerprint keys the entry to the loaded frame too, so an hourly
+    data refresh or a different data path gets its own slices instead of
+    stale ones, and the ttl matches the loaders'.
+    """
+    return df_US.loc[start_date:end_date]
+
+
+def create_time_series_plot(df_US_filtered, selected_stat):
+    """
+    Create a dual-line plot showing selected COVID stat and flight volume over time.
+
+    Args:
+        df_US_filtered (pd.DataFrame): US COVID and flight data, already
+            sliced to the selected month range
+        selected_stat (str): Selected COVID statistic to display
+
+    Returns:
+        go.Figure: Plotly figure object containing the time series plot
+    """
+    fig = go.Figure()
+
+    # Add COVID stat line with improved formatting
+    fig.add_trace(
+        go.Scattergl(
+            x=df_US_filtered.index,
+            y=df_US_filtered[selected_stat],
+            name=selected_stat.replace('_', ' ').title(),
+            line=dict(color='#FF4B4B', width=3),
+            yaxis='y'
+        )
+    )
+
+    # Add flight volume line with improved formatting
+    fig.add_trace(
+        go.Scattergl(
+            x=df_US_filtered.index,
+            y=df_US_filtered['flight_count'],
+            name='Flight Volume',
+            line=dict(color='#1F77B4', width=3),
+            yaxis='y2'
+        )
+    )
+
+    # Update layout with improved styling and secondary y-axis
+    fig.update_layout(
+        xaxis=dict(
+            title='Month',
+            tickangle=45
+        ),
+        yaxis=dict(
+            title=selected_stat.replace('_', ' ').title(),
+            titlefont=dict(color='#FF4B4B'),
+            tickfont=dict(color='#FF4B4B')
+        ),
+        yaxis2=dict(
+            title='Flight Volume',
+            titlefont=dict(color='#1F77B4'),
+            tickfont=dict(color='#1F77B4'),
+            anchor='x',
+            overlaying='y',
+            side='right',
+            showgrid=False
+        ),
+        title=f'US {selected_stat.replace("_", " ").title()} and Flight Volume Trends',
+        hovermode='x unified',
+        plot_bgcolor='white',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01
+        )
+    )
+
+    return fig
+
+
+def update_time_series_plot(fig, df_US_filtered, selected_stat):
+    """
+    Refresh the retained time-series figure in place for a new range/stat.
+
+    Mutating the existing traces inside batch_update skips rebuilding the
+    whole figure (trace assembly plus layout merge) on every rerun; only
+    the arrays and the stat-dependent labels change.
+
+    Args:
+        fig (go.Figure): Figure previously built by create_time_series_plot
+        df_US_filtered (pd.DataFrame): US data sliced to the selected range
+        selected_stat (str): Selected COVID statistic to display
+
+    Returns:
+        go.Figure: The same figure object, updated
+    """
+    stat_label = selected_stat.replace('_', ' ').title()
+    with fig.batch_update():
+        fig.data[0].x = df_US_filtered.index
+        fig.data[0].y = df_US_filtered[selected_stat]
+        fig.data[0].name = stat_label
+        fig.data[1].x = df_US_filtered.index
+        fig.data[1].y = df_US_filtered['flight_count']
+        fig.layout.yaxis.title.text = stat_label
+        fig.layout.title.text = f'US {stat_label} and Flight Volume Trends'
+    return fig
+
+
+def create_choropleth_maps(flight_cum, df_covid_month, stat_col, start_date, end_date,
+                           max_flights, max_cases, countries_path):
+    """
+    Create side-by-side choropleth maps showing global flight volumes and COVID cases.
+
+    Args:
+        flight_cum (pd.DataFrame): Cumulative month x origin-country flight pivot
+        df_covid_month (pd.DataFrame): DataFrame containing global COVID data
+        stat_col (str): COVID stat column to map
+        start_date (str): Start date for filtering
+        end_date (str): End date for filtering
+        max_flights (float): Fixed upper bound for the flight color scale
+        max_cases (float): Fixed upper bound for the COVID color scale
+        countries_path (str): path to the ISO 3166 countries.csv
+
+    Returns:
+        go.Figure: Plotly figure object containing the choropleth maps
+    """
+    # Range total per origin country from the cumulative pivot; the bounds
+    # are clipped onto the months the pivot actually has, so a month with
+    # covid data but no flights at either edge of the range cannot raise
+    end_pos = max(flight_cum.index.searchsorted(end_date, side='right') - 1, 0)
+    start_pos = flight_cum.index.searchsorted(start_date, side='left')
+    totals = flight_cum.iloc[end_pos]
+    if start_pos:
+        totals = totals - flight_cum.iloc[start_pos - 1]
+    df_flights_filtered = totals.rename('flight_count').rename_axis('origin_iso3').reset_index()
+    _, a3_to_name = _load_iso_countries(countries_path)
+
+    # Filter and prepare COVID data
+    df_covid_filtered = df_covid_month.loc[start_date:end_date].groupby(
+        'country', observed=True)[stat_col].max().reset_index()
+
+    # Create subplot figure with two separate subplots
+    fig = go.Figure()
+
+    # Add flight volume map with fixed scale
+    fig.add_trace(
+        go.Choropleth(
+            locations=df_flights_filtered['origin_iso3'],
+            z=df_flights_filtered['flight_count'],
+            locationmode='ISO-3',
+            text=df_flights_filtered['origin_iso3'].map(a3_to_name),
+            colorscale='Viridis',
+            name='Flight Volume',
+            zmin=0,
+            zmax=max_flights,
+            colorbar=dict(
+                title='Flights',
+                x=0.46,
+            ),
+            geo='geo'
+        )
+    )
+
+    # Add COVID cases map with fixed scale
+    fig.add_trace(
+        go.Choropleth(
+            locations=df_covid_filtered['country'],
+            z=df_covid_filtered[stat_col],
+            locationmode='country names',
+            colorscale='Reds',
+            name='COVID Cases',
+            zmin=0,
+            zmax=max_cases,
+            colorbar=dict(
+                title='Cases',
+                x=0.98,
+            ),
+            geo='geo2'
+        )
+    )
+
+    # Update layout with two separate geo subplots
+    fig.update_layout(
+        geo=dict(
+            scope='world',
+            showframe=False,
+            showcoastlines=True,
+            projection_type='equirectangular',
+            domain=dict(x=[0, 0.46], y=[0, 1])
+        ),
+        geo2=dict(
+            scope='world',
+            showframe=False,
+            showcoastlines=True,
+            projection_type='equirectangular',
+            domain=dict(x=[0.52, 0.98], y=[0, 1])
+        ),
+        width=1200,
+        height=500,
+        autosize=False,
+        annotations=[
+            dict(
+                text=f'Flight Volume into US by Origin Country ({start_date} to {end_date})',
+                showarrow=False,
+                x=0.05,
+                y=1.1,
+                xref='paper',
+                yref='paper',
+                font=dict(size=14)
+            ),
+            dict(
+                text=f'COVID Cases (monthly new) by Country ({start_date} to {end_date})',
+                showarrow=False,
+                x=0.725,
+                y=1.1,
+                xref='paper',
+                yref='paper',
+                font=dict(size=14)
+            )
+        ]
+    )
+
+    return fig
+
+
+def calculate_correlation(df_US_filtered, selected_stat):
+    """
+    Calculate the correlation between selected COVID stat and flight volume.
+
+    Args:
+        df_US_filtered (pd.DataFrame): US COVID and flight data, already
+            sliced to the selected month range
+        selected_stat (str): Selected COVID statistic
+
+    Returns:
+        float: Correlation coefficient
+    """
+    return df_US_filtered[selected_stat].corr(df_US_filtered['flight_count'])
@@ -19,16 +19,34 @@ The input files are daily flight information about flight origin and destination
 Run the script with:
 python src/process_data.py --year_month 202101 --country US
 
+To speed up repeated runs, convert the raw CSV folders to Parquet once with:
+python src/process_data.py --convert_to_parquet
+Later runs automatically pick up the Parquet copies and only read the
+partitions and columns they need.
 """
 # start a spark session
 import pandas as pd
 from pyspark.sql import SparkSession
 import pyspark.sql.functions as F
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, FloatType, TimestampType
-from pyspark.sql.window import Window
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, FloatType, TimestampType, DateType, LongType
 from pyspark.sql import DataFrame
+from pyspark import StorageLevel
 import argparse
+import glob
 import sys
+import os
+from itertools import chain
+
+try:
+    import duckdb   # optional: much faster CSV parser than Spark's for the small per-batch files
+except ImportError:
+    duckdb = None
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv   # optional: Arrow CSV writer avoids the row-by-row pandas one
+except ImportError:
+    pa = None
 # hide the warning
 # Initialize Spark session before setting log level
 
@@ -42,33 +60,87 @@ logger = logging.getLogger(__name__)
 # COVID related data processing
 ###########################################################
 
+COVID_SCHEMA = StructType([
+    StructField("FIPS", StringType(), True),
+    StructField("Admin2", StringType(), True),
+    StructField("Province_State", StringType(), True),
+    StructField("Country_Region", StringType(), True),
+    StructField("Last_Update", TimestampType(), True),
+    StructField("Lat", FloatType(), True),
+    StructField("Long_", FloatType(), True),
+    StructField("Confirmed", IntegerType(), True),
+    StructField("Deaths", IntegerType(), True),
+    StructField("Recovered", IntegerType(), True),
+    StructField("Active", IntegerType(), True),
+    StructField("Combined_Key", StringType(), True),
+    StructField("Incident_Rate", FloatType(), True),
+    StructField("Case_Fatality_Ratio", FloatType(), True),
+]
+)
+
+
+def convert_covid_to_parquet(spark: SparkSession, data_path: str):
+    """
+    One-time conversion of the daily covid CSV files to a Parquet folder
+    partitioned by year_month (taken from the file name, which is the batch date).
+    Parquet embeds the schema and is columnar, so later loads only read the
+    partitions and columns they need instead of re-parsing every CSV.
+    """
+    df = spark.read.csv(f"{data_path}/*.csv", header=True, schema=COVID_SCHEMA, mode='DROPMALFORMED')
+    df = df.withColumn('year_month',
+                       F.concat_ws('-',
+                                   F.regexp_extract(F.input_file_name(), r'(\d{2})-(\d{2})-(\d{4})\.csv', 3),
+                                   F.regexp_extract(F.input_file_name(), r'(\d{2})-(\d{2})-(\d{4})\.csv', 1)))
+    df.write.mode('overwrite').partitionBy('year_month').parquet(f"{data_path}_parquet", compression='snappy')
+    logger.info(f"Converted {data_path} to {data_path}_parquet")
+
+
 def load_covid_data(spark: SparkSession, data_path: str, batch_date: str) -> DataFrame:
     """
     Load the covid data for a given batch date. batch_date is in the format of MM-DD-YYYY
+    (each part can be a * wildcard). Prefers the Parquet copy when it exists so the
+    partition filter prunes everything outside the requested year/month.
     """
-    schema = StructType([
-        StructField("FIPS", StringType(), True),
-        StructField("Admin2", StringType(), True),
-        StructField("Province_State", StringType(), True),
-        StructField("Country_Region", StringType(), True),
-        StructField("Last_Update", TimestampType(), True),
-        StructField("Lat", FloatType(), True),
-        StructField("Long_", FloatType(), True),
-        StructField("Confirmed", IntegerType(), True),
-        StructField("Deaths", IntegerType(), True),
-        StructField("Recovered", IntegerType(), True),
-        StructField("Active", IntegerType(), True),
-        StructField("Combined_Key", StringType(), True),
-        StructField("Incident_Rate", FloatType(), True),
-        StructField("Case_Fatality_Ratio", FloatType(), True),
-    ]
-    )
+    # only these columns survive the daily aggregation; dropping the rest at load
+    # time (FIPS, Admin2, lat/long, rates, ...) halves the bytes moved around
+    used_cols = ['Province_State', 'Country_Region', 'Last_Update',
+                 'Confirmed', 'Deaths', 'Recovered', 'Active']
+    parquet_path = f"{data_path}_parquet"
+    if os.path.exists(parquet_path):
+        df_covid = spark.read.parquet(parquet_path)
+        month, _, year = batch_date.split('-')
+        if year != '*':
+            df_covid = df_covid.filter(F.col('year_month').startswith(year))
+        if month != '*':
+            df_covid = df_covid.filter(F.col('year_month').endswith(f'-{month}'))
+        return df_covid.select(*used_cols)
+    if duckdb is not None:
+        # duckdb's native CSV reader is multi-threaded and avoids the JVM row
+        # conversion; pass the explicit column types so it skips type sniffing
+        duckdb_types = {
+            'FIPS': 'VARCHAR', 'Admin2': 'VARCHAR', 'Province_State': 'VARCHAR',
+            'Country_Region': 'VARCHAR', 'Last_Update': 'TIMESTAMP',
+            'Lat': 'FLOAT', 'Long_': 'FLOAT',
+            'Confirmed': 'INTEGER', 'Deaths': 'INTEGER', 'Recovered': 'INTEGER', 'Active': 'INTEGER',
+            'Combined_Key': 'VARCHAR', 'Incident_Rate': 'FLOAT', 'Case_Fatality_Ratio': 'FLOAT',
+        }
+        try:
+            # to_arrow_table, not .arrow(): on duckdb >= 1.3 the latter
+            # returns a RecordBatchReader, not a Table
+            arrow_tbl = duckdb.read_csv(f"{data_path}/{batch_date}.csv", header=True,
+                                        columns=duckdb_types,
+                                        ignore_errors=True).to_arrow_table()
+            return spark.createDataFrame(arrow_tbl.select(used_cols).to_pandas())
+        except Exception as e:
+            logger.warning(f"DuckDB read failed for {batch_date}: {e} \nFalling back to Spark CSV reader")
     try:
-        df_covid = spark.read.csv(f"{data_path}/{batch_date}.csv", header=True, schema=schema, mode='DROPMALFORMED')
+        # the CSV schema is positional so the unused columns stay in the read
+        # schema, but the immediate select lets Catalyst prune them at the scan
+        df_covid = spark.read.csv(f"{data_path}/{batch_date}.csv", header=True, schema=COVID_SCHEMA, mode='DROPMALFORMED')
     except Exception as e:
         logger.error(f"Error loading covid data for {batch_date}: {e} \nSkip this batch date")
         return None
-    return df_covid
+    return df_covid.select(*used_cols)
 
 
 def process_covid_daily_data(df: DataFrame, country: list[str] = None) -> DataFrame:
@@ -82,53 +154,76 @@ def process_covid_daily_data(df: DataFrame, country: list[str] = None) -> DataFr
     Returns:
         DataFrame, the daily data for the given country
     """
-    locations = ['Admin2', 'Province_State', 'Country_Region']
+    locations = ['Province_State', 'Country_Region']
     stats = ['Confirmed', 'Deaths', 'Recovered', 'Active']
 
     if country is None:
         df_daily = df
     else:
-        df_daily = df.filter(df['Country_Region'].isin(country))
-
-    df_daily = df_daily.withColumn('date', F.date_format(F.col('Last_Update'), 'yyyy-MM-dd'))
+        # broadcast inner join instead of a per-row in-list scan: Catalyst lowers
+        # this to one hash probe per row regardless of how many countries are asked for
+        country_df = df.sparkSession.createDataFrame([(c,) for c in country], ['Country_Region'])
+        df_daily = df.join(F.broadcast(country_df), 'Country_Region', 'inner')
+
+    # keep date as a DateType: the year filters and monthly truncation below then
+    # run on the int date value instead of re-parsing a formatted string per row
+    df_daily = df_daily.withColumn('date', F.to_date(F.col('Last_Update')))
     df_daily = df_daily[['date'] + locations + stats]
 
     # drop rows with missing date
-    
-    _count = df_daily.select(
-        F.count(F.when(F.isnull('date') | (F.year('date') >= 2024) | (F.year('date') < 2020), 1)).alias('date Missing Abnormal'),
-        (F.count(F.when(F.isnull('date') | (F.year('date') >= 2024) | (F.year('date') < 2020), 1)) / F.count('*') * 100).alias('date Missing Abnormal %')
-    )
-    _details = df_daily.filter(
-        F.isnull('date') | (F.year('date') >= 2024) | (F.year('date') < 2020)
-    )
-    with pd.option_context('display.max_columns', 1000, 'display.width', 1000, ):
-        logger.info(f"{'='*10} date is missing or abnormal: {'='*10}"
-                    f"\n{_count.toPandas()}"
-                    f"\n{_details.toPandas().head(10)}")
-    
+    # the diagnostics are full scans of the data, so only pay for them when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        _abnormal = F.isnull('date') | (F.year('date') >= 2024) | (F.year('date') < 2020)
+        _count = df_daily.agg(
+            F.count(F.when(_abnormal, 1)).alias('abnormal'),
+            F.count('*').alias('total')
+        ).collect()[0]
+        logger.debug(f"{'='*10} date is missing or abnormal: {'='*10}"
+                     f"\n{_count['abnormal']} of {_count['total']} rows "
+                     f"({_count['abnormal'] / max(_count['total'], 1) * 100:.3f}%)")
+
     logger.info(f"Dropping rows with missing or abnormal date")
     df_daily = df_daily.na.drop(subset=['date']).filter((F.year('date') >= 2020) & (F.year('date') <= 2024))
 
     # aggregate by date and country
     df_daily = df_daily.groupBy('date', 'Country_Region').agg(
         *[F.sum(c).alias(c) for c in stats]
-    ).sort(['Country_Region', 'date'])
+    )
+
+    # get daily change from the previous day for Confirmed, Deaths, Recovered, Active:
+    # one grouped pandas pass per country where diff() is a vectorized C loop,
+    # instead of a window exchange plus per-row lag evaluation
+    daily_schema = StructType(
+        [StructField('date', DateType(), True),
+         StructField('Country_Region', StringType(), True)]
+        + [StructField(f'{stat}_cumulative', LongType(), True) for stat in stats]
+        + [StructField(f'{stat}_daily_new', LongType(), True) for stat in stats]
+    )
+
+    def _add_daily_new(pdf):
+        pdf = pdf.sort_values('date')
+        for stat in stats:
+            pdf[f'{stat}_daily_new'] = pdf[stat].diff().astype('Int64')
+        return pdf.rename(columns={stat: f'{stat}_cumulative' for stat in stats})
 
-    # get daily change from the previous day for Confirmed, Deaths, Recovered, Active
-    for stat in stats:
-        df_daily = df_daily.withColumn(f'{stat}_daily_new', 
-                            F.col(stat) - F.lag(stat).over(Window.partitionBy().orderBy('date'))) \
-                 .withColumnRenamed(stat, f'{stat}_cumulative')
+    df_daily = df_daily.groupBy('Country_Region').applyInPandas(_add_daily_new, schema=daily_schema)
     
-    with pd.option_context('display.max_columns', 1000, 'display.width', 1000, ):
-        logger.info(f"{'='*10} Aggregate by date: {'='*10}"
-                    f"\n{df_daily.toPandas().head(5)}")
-
-    # check missing
-    with pd.option_context('display.max_columns', 1000, 'display.width', 1000, ):
-        logger.info(f"{'='*10} Count na values: {'='*10}"
-                    f"\n{df_daily.select([F.count(F.when(F.isnull(c), c)).alias(c) for c in df_daily.columns]).toPandas()}")
+    # cluster by country so the monthly rollup's groupBy on
+    # (year_month, Country_Region) aggregates within partitions instead of
+    # shuffling again, then cache: the diagnostics below and the monthly rollup
+    # would otherwise each re-run the whole read + filter + aggregation;
+    # the caller unpersists once the monthly rollup is saved
+    df_daily = df_daily.repartition('Country_Region').persist(StorageLevel.MEMORY_AND_DISK)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        with pd.option_context('display.max_columns', 1000, 'display.width', 1000, ):
+            logger.debug(f"{'='*10} Aggregate by date: {'='*10}"
+                         f"\n{pd.DataFrame(df_daily.take(5), columns=df_daily.columns)}")
+
+        # check missing: one aggregation pass counting nulls for every column
+        _nulls = df_daily.agg(*[F.sum(F.col(c).isNull().cast('int')).alias(c) for c in df_daily.columns],
+                              F.count('*').alias('_n')).collect()[0]
+        logger.debug(f"{'='*10} Count na values: {'='*10}\n{_nulls.asDict()}")
     return df_daily
 
 
@@ -145,37 +240,135 @@ def process_covid_monthly_data(df: DataFrame) -> DataFrame:
     locations = ['Admin2', 'Province_State', 'Country_Region']
     stats = ['Confirmed', 'Deaths', 'Recovered', 'Active']
     df_monthly = df.withColumn('year_month', F.date_format(F.col('date'), 'yyyy-MM'))
+    # no sort here: a global sort is a full range-partition shuffle, and the CSV
+    # ordering is handled on the driver when the (small) result is written out
     df_monthly = df_monthly.groupBy(['year_month', 'Country_Region']).agg(
         *[F.max(c + '_cumulative').alias(c + '_cumulative') for c in stats],
         *[F.sum(c + '_daily_new').alias(c + '_monthly_new') for c in stats]
-    ).sort(['Country_Region', 'year_month'])
+    )
     return df_monthly
 
 
-def save_covid_data(df: DataFrame, data_path: str, filename: str):
-    df.toPandas().to_csv(f'{data_path}/{filename}.csv', index=False)
+def _write_csv(df: DataFrame, path: str, sort_cols: list[str] = None):
+    """
+    Collect a Spark DataFrame to the driver over Arrow and write it as a single
+    CSV file, sorting the collected result by sort_cols first. Sorting here is
+    one in-memory pass on the driver, instead of a range-partition shuffle in
+    the Spark pipeline. The Arrow batches go straight into pyarrow's CSV writer,
+    skipping the pandas materialization and its row-by-row to_csv loop; fall
+    back to the pandas writer when pyarrow is not installed.
+    """
+    if pa is not None:
+        batches = df._collect_as_arrow()
+        if batches:
+            tbl = pa.Table.from_batches(batches)
+            if sort_cols:
+                tbl = tbl.sort_by([(c, 'ascending') for c in sort_cols])
+            pa_csv.write_csv(tbl, path)
+            return
+    pdf = df.toPandas()
+    if sort_cols:
+        pdf.sort_values(sort_cols, inplace=True)
+    pdf.to_csv(path, index=False)
+
+
+def save_covid_data(df: DataFrame, data_path: str, filename: str, sort_cols: list[str] = None):
+    _write_csv(df, f'{data_path}/{filename}.csv', sort_cols)
 
 
 ###########################################################
 # Flight related data processing
 ###########################################################
 
+AIRPORTS_SCHEMA = StructType([
+    StructField("icao", StringType(), True),
+    StructField("iata", StringType(), True),
+    StructField("name", StringType(), True),
+    StructField("city", StringType(), True),
+    StructField("subd", StringType(), True),
+    StructField("country", StringType(), True),
+    StructField("elevation", FloatType(), True),
+    StructField("lat", FloatType(), True),
+    StructField("lon", FloatType(), True),
+    StructField("tz", StringType(), True),
+    StructField("lid", StringType(), True),
+]
+)
+
+COUNTRIES_SCHEMA = StructType([
+    StructField("English short name lower case", StringType(), True),
+    StructField("Alpha-2 code", StringType(), True),
+    StructField("Alpha-3 code", StringType(), True),
+    StructField("Numeric code", IntegerType(), True),
+    StructField("ISO 3166-2", StringType(), True),
+]
+)
+
+
 def load_airports(spark: SparkSession, data_path: str):
-    airports = spark.read.csv(f'{data_path}/airports.csv', header=True, inferSchema=True)
+    # the schema of these fixed mapping tables is known, so skip inferSchema's
+    # extra pass over the file to sniff the types
+    airports = spark.read.csv(f'{data_path}/airports.csv', header=True, schema=AIRPORTS_SCHEMA)
     return airports
 
 def load_countries(spark: SparkSession, data_path: str):
-    countries = spark.read.csv(f'{data_path}/countries.csv', header=True, inferSchema=True) \
+    countries = spark.read.csv(f'{data_path}/countries.csv', header=True, schema=COUNTRIES_SCHEMA) \
     .withColumnRenamed('English short name lower case', 'country') \
     .withColumnRenamed('Alpha-2 code', 'country_code') \
     .select('country', 'country_code')
     return countries
 
+def convert_flight_to_parquet(spark: SparkSession, data_path: str):
+    """
+    One-time conversion of the gzipped flight CSV files to a Parquet folder
+    partitioned by year_month (taken from the file name). Gzip CSV is not
+    splittable, so this also fixes the per-file parallelism for later runs.
+    """
+    df = spark.read.csv(f"{data_path}/flightlist_*.csv.gz", header=True, inferSchema=True)
+    df = df.withColumn('year_month', F.regexp_extract(F.input_file_name(), r'flightlist_(\d{6})', 1))
+    df.write.mode('overwrite').partitionBy('year_month').parquet(f"{data_path}_parquet", compression='snappy')
+    logger.info(f"Converted {data_path} to {data_path}_parquet")
+
+
 def load_flight_data(spark: SparkSession, data_path: str, batch_date: str):
     logger.info(f"Loading flight data for {batch_date}...")
     batch_date = batch_date[:6]   # only use year and month
+    parquet_path = f"{data_path}_parquet"
+    if os.path.exists(parquet_path):
+        return spark.read.parquet(parquet_path) \
+            .filter(F.col('year_month').startswith(batch_date)) \
+            .select('day', 'origin', 'destination')
+    if duckdb is not None:
+        try:
+            arrow_tbl = duckdb.sql(
+                f"SELECT day, origin, destination "
+                f"FROM read_csv_auto('{data_path}/flightlist_{batch_date}*_{batch_date}*.csv.gz', HEADER=TRUE)"
+            ).to_arrow_table()
+            return spark.createDataFrame(arrow_tbl.to_pandas())
+        except Exception as e:
+            logger.warning(f"DuckDB read failed for {batch_date}: {e} \nFalling back to Spark CSV reader")
+    files = sorted(glob.glob(f'{data_path}/flightlist_{batch_date}*_{batch_date}*.csv.gz'))
+    if not files:
+        logger.error(f"No flight data found for {batch_date} \nSkip this batch date")
+        return None
+    # gzip is not splittable, so give every file its own partition and parse it
+    # with a pandas reader there: parallelism then equals the file count
+    flight_schema = StructType([
+        StructField('day', StringType(), True),
+        StructField('origin', StringType(), True),
+        StructField('destination', StringType(), True),
+    ])
+
+    def _read_files(paths):
+        for path in paths:
+            pdf = pd.read_csv(path, compression='gzip', usecols=['day', 'origin', 'destination'])
+            pdf = pdf.astype(object).where(pdf.notna(), None)
+            for row in pdf.itertuples(index=False):
+                yield (row.day, row.origin, row.destination)
+
     try:
-        df_flight = spark.read.csv(f'{data_path}/flightlist_{batch_date}*_{batch_date}*.csv.gz', header=True, inferSchema=True).select('day', 'origin', 'destination')
+        rdd = spark.sparkContext.parallelize(files, len(files))
+        df_flight = spark.createDataFrame(rdd.mapPartitions(_read_files), flight_schema)
     except Exception as e:
         logger.error(f"Error loading flight data for {batch_date}: {e} \nSkip this batch date")
         return None
@@ -193,28 +386,46 @@ def map_flight_data(df_flight: DataFrame, airports: DataFrame, countries: DataFr
     Returns:
         df_flight_mapped: DataFrame, the flight data with country and icao
     """
-    airports = airports.select('icao', 'country')
-    df_flight_mapped = df_flight.join(airports, df_flight['origin'] == airports['icao'], 'left')\
-        .withColumnRenamed('country', 'origin_country').withColumnRenamed('icao', 'origin_icao') \
-    .join(airports, df_flight['destination'] == airports['icao'], 'left') \
-    .withColumnRenamed('country', 'destination_country').withColumnRenamed('icao', 'destination_icao') \
-    .select('day', 'origin_country', 'destination_country', 'origin_icao', 'destination_icao')
-    df_flight_mapped = df_flight_mapped.withColumn('day', F.to_date('day')) \
-        .withColumn('year_month', F.date_format('day', 'yyyy-MM')) \
-        .select('day', 'year_month', 'origin_country', 'destination_country', 'origin_icao', 'destination_icao')
-    # map country abbreviation to country name
-    df_flight_mapped = df_flight_mapped.join(countries, df_flight_mapped['origin_country'] == countries['country_code'], 'left') \
-        .drop('country_code') \
-        .withColumnRenamed('origin_country', 'origin_country_code').withColumnRenamed('country', 'origin_country')
-    df_flight_mapped = df_flight_mapped.join(countries, df_flight_mapped['destination_country'] == countries['country_code'], 'left') \
-        .drop('country_code') \
-        .withColumnRenamed('destination_country', 'destination_country_code').withColumnRenamed('country', 'destination_country')
-    
-
-    logger.info(f"Count of missing country or date"
-                f"\n{df_flight_mapped.select([F.count(F.when(F.isnull(c), c)).alias(c) for c in df_flight_mapped.columns]).toPandas()}")
+    # icao -> country code stays a broadcast dict resolved in a vectorized UDF:
+    # inlining all ~60k airports as a map literal would bloat the plan more than
+    # the lookup saves. The ~250-entry code -> name table is small enough to be
+    # a map literal though, so that lookup runs as a hash probe in generated
+    # code with no Python round trip.
+    spark = df_flight.sparkSession
+    lookup = {row['icao']: row['country'] for row in airports.select('icao', 'country').collect()}
+    bc_lookup = spark.sparkContext.broadcast(lookup)
+    name_map = F.create_map(*chain.from_iterable(
+        (F.lit(row['country_code']), F.lit(row['country'])) for row in countries.collect()
+    ))
+
+    @F.pandas_udf(StringType())
+    def _resolve(icao: pd.Series) -> pd.Series:
+        return icao.map(bc_lookup.value)
+
+    # one projection for the whole output schema: the day parsing, year_month
+    # formatting and country-name lookups all land in a single Project node
+    # instead of a chain of withColumn rewrites
+    day = F.to_date('day')
+    df_flight_mapped = df_flight.withColumn('_origin_code', _resolve('origin')) \
+        .withColumn('_destination_code', _resolve('destination')) \
+        .select(day.alias('day'),
+                F.date_format(day, 'yyyy-MM').alias('year_month'),
+                F.col('_origin_code').alias('origin_country_code'),
+                F.element_at(name_map, F.col('_origin_code')).alias('origin_country'),
+                F.col('_destination_code').alias('destination_country_code'),
+                F.element_at(name_map, F.col('_destination_code')).alias('destination_country'),
+                F.col('origin').alias('origin_icao'),
+                F.col('destination').alias('destination_icao'))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        _nulls = df_flight_mapped.agg(*[F.sum(F.col(c).isNull().cast('int')).alias(c) for c in df_flight_mapped.columns],
+                                      F.count('*').alias('_n')).collect()[0]
+        logger.debug(f"Count of missing country or date\n{_nulls.asDict()}")
     # drop rows with missing country or date
     df_flight_mapped = df_flight_mapped.filter(F.col('origin_country').isNotNull() & F.col('destination_country').isNotNull() & F.col('day').isNotNull())
+    # exclude domestic flight here, right after the mapping, so those rows never
+    # reach the aggregation shuffle downstream
+    df_flight_mapped = df_flight_mapped.filter(F.col('origin_country_code') != F.col('destination_country_code'))
 
     return df_flight_mapped
 
@@ -231,28 +442,53 @@ def process_flight_data(df: DataFrame, direction: str = 'origin', granular: str
     """
     assert direction in ['origin', 'destination']
     assert granular in ['day', 'year_month']
-    opposite_direction = 'origin' if direction == 'destination' else 'destination'
     if country:
-        df = df.filter(F.col(f'{direction}_country').isin(country))
-    # exclude domestic flight
-    df = df.filter(F.col('origin_country_code') != F.col('destination_country_code'))
+        # same broadcast-join trick as the covid filter; this side matters more
+        # because the flight data is much larger
+        country_df = df.sparkSession.createDataFrame([(c,) for c in country], [f'{direction}_country'])
+        df = df.join(F.broadcast(country_df), f'{direction}_country', 'inner')
+    # domestic flights are already excluded during the mapping step; cluster the
+    # rows by the aggregation key so the groupBy can reuse this one exchange
+    df = df.repartition(f'{direction}_country_code')
     # aggrgate by country and month or day
+    # like the monthly covid rollup, leave the result unsorted and order the
+    # small aggregated output on the driver at write time
     df_agg = df.groupBy(f'{granular}', 'origin_country', 'origin_country_code', 'destination_country', 'destination_country_code').agg(
         F.count('*').alias(f'flight_count')
-    ).sort(f'{direction}_country_code', f'{opposite_direction}_country_code', f'{granular}')
+    )
     return df_agg
 
-def save_flight_data(df: DataFrame, data_path: str, filename: str):
-    df.toPandas().to_csv(f'{data_path}/{filename}.csv', index=False)
+def save_flight_data(df: DataFrame, data_path: str, filename: str, sort_cols: list[str] = None):
+    _write_csv(df, f'{data_path}/{filename}.csv', sort_cols)
+
+
+def build_spark_session() -> SparkSession:
+    """
+    Create the Spark session with the tuning this pipeline relies on: adaptive
+    query execution (coalesces the mostly-empty shuffle partitions and splits
+    skewed joins on its own), Arrow for every pandas interchange, a shuffle
+    partition count sized for the small aggregated data, and a broadcast
+    threshold that keeps the lookup tables on the map side.
+    """
+    spark = SparkSession.builder.appName("COVID-19 and Flight Volume Analysis") \
+        .config('spark.sql.adaptive.enabled', 'true') \
+        .config('spark.sql.adaptive.coalescePartitions.enabled', 'true') \
+        .config('spark.sql.adaptive.skewJoin.enabled', 'true') \
+        .config('spark.sql.shuffle.partitions', '16') \
+        .config('spark.sql.execution.arrow.pyspark.enabled', 'true') \
+        .config('spark.sql.execution.arrow.maxRecordsPerBatch', '20000') \
+        .config('spark.sql.autoBroadcastJoinThreshold', str(64 * 1024 * 1024)) \
+        .getOrCreate()
+    spark.sparkContext.setLogLevel("ERROR")
+    return spark
 
 
-def main(data_path: str, covid_folder: str, flight_folder: str, save_folder: str, 
+def main(data_path: str, covid_folder: str, flight_folder: str, save_folder: str,
          year_month: str, country: list[str] = None):
     """
     Main function to process the data
     """
-    spark = SparkSession.builder.appName("COVID-19 and Flight Volume Analysis").getOrCreate()
-    spark.sparkContext.setLogLevel("ERROR")
+    spark = build_spark_session()
     covid_year_month = f'{year_month[4:] if len(year_month) > 4 else "*"}-*-{year_month[:4] if len(year_month) >= 4 else "*"}'
     
     covid_data_path = f'{data_path}/{covid_folder}'
@@ -263,7 +499,8 @@ def main(data_path: str, covid_folder: str, flight_folder: str, save_folder: str
     df_covid = load_covid_data(spark, covid_data_path, covid_year_month)
     if df_covid is not None:
         covid_daily = process_covid_daily_data(df_covid, None)   # need all country instead of covid_country
-        covid_monthly = process_covid_monthly_data(covid_daily)
+        # cache the monthly rollup: it is saved twice (all countries + the country subset)
+        covid_monthly = process_covid_monthly_data(covid_daily).persist(StorageLevel.MEMORY_AND_DISK)
     else:
         covid_daily = None
         covid_monthly = None
@@ -278,14 +515,18 @@ def main(data_path: str, covid_folder: str, flight_folder: str, save_folder: str
         df_flight_mapped = None
         df_flight_monthly = None
 
+    covid_sort_cols = ['Country_Region', 'year_month']
+    flight_sort_cols = ['destination_country_code', 'origin_country_code', 'year_month']
     if covid_monthly is not None:
-        save_covid_data(covid_monthly, f'{data_path}/{save_folder}', f'covid_{year_month}_all')
+        save_covid_data(covid_monthly, f'{data_path}/{save_folder}', f'covid_{year_month}_all', covid_sort_cols)
         if country:
             covid_monthly_country = covid_monthly.filter(F.col('Country_Region').isin(country))
-            save_covid_data(covid_monthly_country, f'{data_path}/{save_folder}', f'covid_{year_month}_{"__".join(country).replace(" ", "_").replace("*", "all")}')
+            save_covid_data(covid_monthly_country, f'{data_path}/{save_folder}', f'covid_{year_month}_{"__".join(country).replace(" ", "_").replace("*", "all")}', covid_sort_cols)
+        covid_monthly.unpersist()
+        covid_daily.unpersist()
 
     if df_flight_monthly is not None:
-        save_flight_data(df_flight_monthly, f'{data_path}/{save_folder}', f'flight_{year_month}_{"__".join(country).replace(" ", "_").replace("*", "all")}')
+        save_flight_data(df_flight_monthly, f'{data_path}/{save_folder}', f'flight_{year_month}_{"__".join(country).replace(" ", "_").replace("*", "all")}', flight_sort_cols)
     
     spark.stop()
     return df_flight_mapped, covid_monthly, covid_monthly_country
@@ -306,6 +547,8 @@ if __name__ == "__main__":
                         help='Path to COVID-19 data directory')
     parser.add_argument('--flight_folder', type=str, default='flight_volume_raw',
                         help='Path to flight volume data directory')
+    parser.add_argument('--convert_to_parquet', action='store_true',
+                        help='One-time conversion of the raw CSV folders to Parquet, then exit')
     parser.add_argument('--log_level', type=str, default='INFO',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                         help='Set the logging level')
@@ -322,8 +565,15 @@ if __name__ == "__main__":
     # change the logger level
     logging.basicConfig(level=getattr(logging, args.log_level))
     logger.setLevel(getattr(logging, args.log_level))
-    
-    main(data_path=data_path, 
+
+    if args.convert_to_parquet:
+        spark = build_spark_session()
+        convert_covid_to_parquet(spark, f'{data_path}/{covid_folder}')
+        convert_flight_to_parquet(spark, f'{data_path}/{flight_folder}')
+        spark.stop()
+        sys.exit(0)
+
+    main(data_path=data_path,
          save_folder=save_folder, 
          covid_folder=covid_folder, 
          flight_folder=flight_folder, 
@@ -9,45 +9,170 @@ streamlit run ./src/streamlit_app.py -- --data_path <path_to_data_folder>
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import argparse
-import sys
+import plotly.io as pio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 
+# orjson serializes figure JSON several times faster than the stdlib
+# engine; every st.plotly_chart call pays this cost
+try:
+    pio.json.config.default_engine = 'orjson'
+except ValueError:
+    pass  # orjson not installed; the stdlib engine still works
+
+
+@st.cache_resource(show_spinner=False)
+def _register_plotly_template() -> str:
+    """
+    Register the app-wide Plotly template once per process. Figures pick
+    the shared styling up from the default instead of re-merging the same
+    layout dicts on every build; the geo block applies to every geo
+    subplot, so both choropleth panels inherit it. Called from the figure
+    builders (not at import) so plotly.graph_objects stays off the
+    cold-start path.
+    """
+    import plotly.graph_objects as go
+
+    pio.templates['covid_app'] = go.layout.Template(
+        layout=go.Layout(
+            plot_bgcolor='white',
+            geo=dict(
+                scope='world',
+                showframe=False,
+                showcoastlines=True,
+                projection_type='equirectangular',
+            ),
+        )
+    )
+    # layer on top of the stock template rather than replacing it
+    pio.templates.default = 'plotly+covid_app'
+    return pio.templates.default
+
+
+@st.cache_resource(show_spinner=False)
+def _load_world_geojson(data_path: str):
+    """
+    Parse the pre-simplified world-borders GeoJSON once per process. The
+    file is optional — generate it offline (e.g. with
+    geopandas.GeoSeries.simplify) as {data_path}/world_simplified.json;
+    when absent the maps fall back to Plotly's built-in full-resolution
+    country geometry.
+    """
+    path = os.path.join(data_path, 'world_simplified.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _month_label(month: int) -> str:
+    """Format an int yyyymm month (e.g. 202008) as 'YYYY-MM' for display."""
+    return f'{month // 100}-{month % 100:02d}'
+
+# cheap DataFrame fingerprint for st.cache_data: shape, columns and a
+# summed row hash instead of Streamlit's deep content hashing
+_DF_HASH = {pd.DataFrame: lambda df: (df.shape, tuple(df.columns),
+                                      pd.util.hash_pandas_object(df, index=True).sum())}
+
+@st.cache_data(ttl=3600, persist="disk", show_spinner="Loading COVID & flight data...")
 def load_data(data_path: str):
     """
     Load and prepare the data for the dashboard.
+    Cached so reruns reuse the prepared DataFrames instead of reparsing
+    the CSVs on every widget interaction; the ttl makes a long-lived
+    server pick up refreshed files hourly. The prepared frames are also
+    written to {data_path}/_cache/*.parquet so cold starts after a process
+    restart skip the CSV parse entirely; the parquet cache is bypassed
+    whenever a source CSV is newer than it.
 
     Args:
         data_path (str): The path to the data file
-    
+
     Returns:
         tuple: Contains two dataframes:
             - df_US: DataFrame with US COVID cases and flight data
             - df_end: DataFrame with global flight data
     """
-    covid_global = pd.read_csv(f'{data_path}/covid_data/time_series_covid19_confirmed_global.csv')  # Update path
-    df_end = pd.read_csv(f'{data_path}/plane_data_results/end_country_us_flight_count.csv')  # Update path
-
-    df_covid_day = covid_global.drop(columns=['Province/State', 'Lat', 'Long']).melt(id_vars=['Country/Region'], var_name='Date', value_name='Confirmed')
-    df_covid_day['Date'] = pd.to_datetime(df_covid_day['Date'], format='%m/%d/%y')
-    df_covid_month = df_covid_day.groupby(['Country/Region', pd.Grouper(key='Date', freq='ME')]).sum().reset_index().rename(columns={'Date': 'month'})
-    df_covid_month['month'] = df_covid_month['month'].dt.strftime('%Y-%m')
-    df_end['month'] = pd.to_datetime(df_end['month'].astype(str), format='%Y%m').dt.strftime('%Y-%m')
-    
-    df_US = df_covid_month[df_covid_month['Country/Region'] == 'US'].merge(
-        df_end[df_end['end_country'] == 'US'], 
-        on='month', 
+    covid_path = f'{data_path}/covid_data/time_series_covid19_confirmed_global.csv'
+    flights_path = f'{data_path}/plane_data_results/end_country_us_flight_count.csv'
+
+    cache_dir = os.path.join(data_path, '_cache')
+    names = ('df_US', 'df_end', 'df_covid_month')
+    cache_paths = [os.path.join(cache_dir, f'{name}.parquet') for name in names]
+    if all(os.path.exists(p) for p in cache_paths):
+        # a reprocessed source CSV invalidates the cache: only serve the
+        # parquet frames while they are newer than both sources
+        newest_source = max(os.path.getmtime(covid_path), os.path.getmtime(flights_path))
+        if newest_source < min(os.path.getmtime(p) for p in cache_paths):
+            return tuple(pd.read_parquet(p) for p in cache_paths)
+
+    def _read_covid():
+        # sniff only the header, then parse just the country and day columns —
+        # Province/State, Lat and Long are skipped before tokenization, and
+        # int32 day counts halve the memory the wide matrix moves
+        day_cols = pd.read_csv(covid_path, nrows=0).columns[4:].tolist()
+        covid_global = pd.read_csv(covid_path, usecols=['Country/Region'] + day_cols,
+                                   dtype={c: 'int32' for c in day_cols}, engine='pyarrow')
+        return day_cols, covid_global
+
+    def _read_flights():
+        return pd.read_csv(flights_path,
+                           dtype={'month': 'int32', 'flights': 'int64'}, engine='pyarrow')
+
+    # the two files are independent and the reads release the GIL inside
+    # pyarrow, so overlapping them hides the smaller read entirely
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        covid_future = pool.submit(_read_covid)
+        flights_future = pool.submit(_read_flights)
+        day_cols, covid_global = covid_future.result()
+        df_end = flights_future.result()
+    # ~200 unique country names: categorical codes hash far cheaper than
+    # Python strings in every downstream groupby and lookup
+    covid_global['Country/Region'] = covid_global['Country/Region'].astype('category')
+    df_end['end_country'] = df_end['end_country'].astype('category')
+
+    # one fused pass over the day columns instead of melt + groupby(Grouper):
+    # the JHU day columns are chronological, so each month is a contiguous
+    # run and np.add.reduceat sums every run for every country at C speed.
+    # Int yyyymm keys come from two vectorized integer ops — no strftime.
+    date_cols = pd.to_datetime(day_cols, format='%m/%d/%y')
+    yyyymm = (date_cols.year * 100 + date_cols.month).to_numpy().astype('int32')
+    starts = np.r_[0, np.flatnonzero(np.diff(yyyymm)) + 1]
+    monthly_mat = np.add.reduceat(covid_global[day_cols].to_numpy(), starts, axis=1)
+    monthly = pd.DataFrame(monthly_mat.T, index=yyyymm[starts],
+                           columns=covid_global['Country/Region'].values)
+    monthly = monthly.T.groupby(level=0, observed=True).sum().T  # collapse province rows
+    df_covid_month = monthly.stack().rename('Confirmed').rename_axis(['month', 'Country/Region']).reset_index()
+    # df_end['month'] already arrives as int yyyymm, matching the covid keys
+
+    # the US series falls straight out of the wide monthly matrix; no need
+    # to scan the long-form frame for it
+    df_us_month = monthly['US'].rename('cases').rename_axis('month').reset_index()
+    # country-keyed index turns the US row extraction into a sorted-index
+    # lookup rather than a boolean scan of df_end
+    end_by_country = df_end.set_index('end_country').sort_index()
+    df_US = df_us_month.merge(
+        end_by_country.loc['US'],
+        on='month',
         how='left'
-    ).rename(
-        columns={'Confirmed': 'cases', 'Country/Region': 'country'}
-    ).drop(columns=['end_country'])
-    
+    )
+    df_US['country'] = 'US'
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for path, df in zip(cache_paths, (df_US, df_end, df_covid_month)):
+            df.to_parquet(path)
+    except (ImportError, OSError):
+        pass  # no parquet engine or read-only data dir; CSVs still work
+
     return df_US, df_end, df_covid_month
 
+@st.cache_data(show_spinner=False, hash_funcs=_DF_HASH)
 def create_time_series_plot(df_US):
     """
     Create a dual-line plot showing COVID cases and flight volume over time.
+    Cached so reruns and tab switches reuse the assembled figure.
     
     Args:
         df_US (pd.DataFrame): DataFrame containing US COVID and flight data
@@ -55,13 +180,25 @@ def create_time_series_plot(df_US):
     Returns:
         go.Figure: Plotly figure object containing the time series plot
     """
+    # deferred import: plotly.graph_objects is heavy and only needed once
+    # per session thanks to the figure cache
+    import plotly.graph_objects as go
+    _register_plotly_template()
+
+    # monthly data today, but if a higher-frequency series is ever loaded,
+    # stride-decimate before shipping points to the browser; the traces
+    # themselves already render via WebGL (Scattergl)
+    if len(df_US) > 2000:
+        df_US = df_US.iloc[::len(df_US) // 2000]
+
     fig = go.Figure()
+    month_labels = df_US['month'].map(_month_label)
 
     # Add COVID cases line with improved formatting
     fig.add_trace(
-        go.Scatter(
-            x=df_US['month'], 
-            y=df_US['cases'], 
+        go.Scattergl(
+            x=month_labels,
+            y=df_US['cases'],
             name='COVID Cases',
             line=dict(color='#FF4B4B', width=3),
             yaxis='y'
@@ -70,9 +207,9 @@ def create_time_series_plot(df_US):
 
     # Add flight volume line with improved formatting
     fig.add_trace(
-        go.Scatter(
-            x=df_US['month'], 
-            y=df_US['flights'], 
+        go.Scattergl(
+            x=month_labels,
+            y=df_US['flights'],
             name='Flight Volume',
             line=dict(color='#1F77B4', width=3),
             yaxis='y2'
@@ -101,7 +238,6 @@ def create_time_series_plot(df_US):
         ),
         title='US COVID Cases and Flight Volume Trends',
         hovermode='x unified',
-        plot_bgcolor='white',
         legend=dict(
             yanchor="top",
             y=0.99,
@@ -112,30 +248,43 @@ def create_time_series_plot(df_US):
     
     return fig
 
-def create_choropleth_maps(df_end, df_covid, start_date, end_date):
+@st.cache_data(show_spinner=False, hash_funcs=_DF_HASH)
+def create_choropleth_maps(df_end, df_covid, start_date, end_date, _geojson=None):
     """
     Create side-by-side choropleth maps showing global flight volumes and COVID cases.
-    
+    Cached per (data, date range) so repeated slider positions are free.
+
     Args:
         df_end (pd.DataFrame): DataFrame containing global flight data
         df_covid (pd.DataFrame): DataFrame containing global COVID data
-        start_date (str): Start date for filtering
-        end_date (str): End date for filtering
-        
+        start_date (int): Start month (yyyymm) for filtering
+        end_date (int): End month (yyyymm) for filtering
+        _geojson (dict, optional): Pre-simplified world-borders GeoJSON;
+            the underscore keeps it out of the cache key
+
     Returns:
         go.Figure: Plotly figure object containing the choropleth maps
     """
+    import plotly.graph_objects as go
+    _register_plotly_template()
+
+    # simplified borders cut client-side vertex count ~10-100x when the
+    # offline-generated file is available
+    if _geojson is not None:
+        geo_kwargs = dict(geojson=_geojson, featureidkey='properties.name')
+    else:
+        geo_kwargs = dict(locationmode='country names')
     # Filter flight data based on date range
     df_flights_filtered = df_end[
         (df_end['month'] >= start_date) & 
         (df_end['month'] <= end_date)
-    ].groupby('end_country')['flights'].sum().reset_index()
+    ].groupby('end_country', observed=True)['flights'].sum().reset_index()
     
     # Filter and prepare COVID data
     df_covid_filtered = df_covid[
         (df_covid['month'] >= start_date) & 
         (df_covid['month'] <= end_date)
-    ].groupby('Country/Region')['Confirmed'].max().reset_index()
+    ].groupby('Country/Region', observed=True)['Confirmed'].max().reset_index()
     
     # Create subplot figure with two separate subplots
     fig = go.Figure()
@@ -145,8 +294,8 @@ def create_choropleth_maps(df_end, df_covid, start_date, end_date):
         go.Choropleth(
             locations=df_flights_filtered['end_country'],
             z=df_flights_filtered['flights'],
-            locationmode='country names',
             colorscale='Viridis',
+            **geo_kwargs,
             name='Flight Volume',
             colorbar=dict(
                 title='Flights',
@@ -161,8 +310,8 @@ def create_choropleth_maps(df_end, df_covid, start_date, end_date):
         go.Choropleth(
             locations=df_covid_filtered['Country/Region'],
             z=df_covid_filtered['Confirmed'],
-            locationmode='country names',
             colorscale='Reds',
+            **geo_kwargs,
             name='COVID Cases',
             colorbar=dict(
                 title='Cases',
@@ -174,26 +323,16 @@ def create_choropleth_maps(df_end, df_covid, start_date, end_date):
     
     # Update layout with two separate geo subplots
     fig.update_layout(
-        geo=dict(
-            scope='world',
-            showframe=False,
-            showcoastlines=True,
-            projection_type='equirectangular',
-            domain=dict(x=[0, 0.48], y=[0, 1])
-        ),
-        geo2=dict(
-            scope='world',
-            showframe=False,
-            showcoastlines=True,
-            projection_type='equirectangular',
-            domain=dict(x=[0.52, 1], y=[0, 1])
-        ),
+        # frame/coastline/projection styling comes from the covid_app
+        # template; only the side-by-side domains are figure-specific
+        geo=dict(domain=dict(x=[0, 0.48], y=[0, 1])),
+        geo2=dict(domain=dict(x=[0.52, 1], y=[0, 1])),
         width=1200,
         height=500,
         autosize=False,
         annotations=[
             dict(
-                text=f'Flight Volume by Destination Country ({start_date} to {end_date})',
+                text=f'Flight Volume by Destination Country ({_month_label(start_date)} to {_month_label(end_date)})',
                 showarrow=False,
                 x=0.05,
                 y=1.1,
@@ -202,7 +341,7 @@ def create_choropleth_maps(df_end, df_covid, start_date, end_date):
                 font=dict(size=14)
             ),
             dict(
-                text=f'COVID Cases by Country ({start_date} to {end_date})',
+                text=f'COVID Cases by Country ({_month_label(start_date)} to {_month_label(end_date)})',
                 showarrow=False,
                 x=0.725,
                 y=1.1,
@@ -215,6 +354,7 @@ def create_choropleth_maps(df_end, df_covid, start_date, end_date):
     
     return fig
 
+@st.cache_data(show_spinner=False, hash_funcs=_DF_HASH)
 def calculate_correlation(df_US):
     """
     Calculate the correlation between COVID cases and flight volume.
@@ -225,7 +365,73 @@ def calculate_correlation(df_US):
     Returns:
         float: Correlation coefficient
     """
-    return df_US['cases'].corr(df_US['flights'])
+    # straight BLAS-backed corrcoef on the raw arrays; pandas' .corr would
+    # route through its nanops dispatch on every rerun
+    a = df_US['cases'].to_numpy(dtype='float64')
+    b = df_US['flights'].to_numpy(dtype='float64')
+    mask = ~(np.isnan(a) | np.isnan(b))
+    return float(np.corrcoef(a[mask], b[mask])[0, 1])
+
+@st.fragment
+def _render_time_series(df_US):
+    """
+    Render the US time-series tab.
+
+    Args:
+        df_US (pd.DataFrame): DataFrame with US COVID and flight data
+    """
+    st.header('US COVID Cases vs Flight Volume Over Time')
+
+    # Create and display time series plot; the figure has no widget
+    # inputs, so reruns reuse the session's JSON-ready object
+    if 'fig_ts' not in st.session_state:
+        st.session_state.fig_ts = create_time_series_plot(df_US)
+    st.plotly_chart(st.session_state.fig_ts, use_container_width=True)
+
+    # Display correlation
+    correlation = calculate_correlation(df_US)
+    st.write(f"Correlation coefficient between cases and flights: {correlation:.2f}")
+
+    # Add explanatory text
+    st.markdown("""
+    ### About this Visualization
+    This chart shows the relationship between COVID-19 cases and flight volumes in the United States over time:
+    - The red line represents the number of COVID-19 cases
+    - The blue line represents the flight volume
+    - Both metrics are plotted on the same scale to show relative changes
+    """)
+
+
+@st.fragment
+def _render_maps(df_end, df_covid_month, data_path):
+    """
+    Render the global comparison tab. Running as a fragment keeps slider
+    moves from rerunning the rest of the script.
+
+    Args:
+        df_end (pd.DataFrame): DataFrame with flight data by end country
+        df_covid_month (pd.DataFrame): DataFrame with monthly COVID data
+        data_path (str): The path to the data file
+    """
+    st.header('Global Flight Volume and COVID Cases by Country')
+
+    # Add timeline selector
+    all_months = sorted(df_end['month'].unique())
+    start_idx, end_idx = st.select_slider(
+        'Select Date Range',
+        options=range(len(all_months)),
+        value=(0, len(all_months)-1),
+        format_func=lambda x: _month_label(all_months[x])
+    )
+
+    start_date = all_months[start_idx]
+    end_date = all_months[end_idx]
+
+    # Create and display choropleth maps
+    fig_maps = create_choropleth_maps(df_end, df_covid_month, start_date, end_date,
+                                      _geojson=_load_world_geojson(data_path))
+    st.plotly_chart(fig_maps, use_container_width=True)
+
 
 def main(data_path: str):
     """
@@ -252,43 +458,10 @@ def main(data_path: str):
     tab1, tab2 = st.tabs(['US Time Series', 'Global Comparison'])
     
     with tab1:
-        st.header('US COVID Cases vs Flight Volume Over Time')
-        
-        # Create and display time series plot
-        fig = create_time_series_plot(df_US)
-        st.plotly_chart(fig, use_container_width=True)
-        
-        # Display correlation
-        correlation = calculate_correlation(df_US)
-        st.write(f"Correlation coefficient between cases and flights: {correlation:.2f}")
-        
-        # Add explanatory text
-        st.markdown("""
-        ### About this Visualization
-        This chart shows the relationship between COVID-19 cases and flight volumes in the United States over time:
-        - The red line represents the number of COVID-19 cases
-        - The blue line represents the flight volume
-        - Both metrics are plotted on the same scale to show relative changes
-        """)
-    
+        _render_time_series(df_US)
+
     with tab2:
-        st.header('Global Flight Volume and COVID Cases by Country')
-        
-        # Add timeline selector
-        all_months = sorted(df_end['month'].unique())
-        start_idx, end_idx = st.select_slider(
-            'Select Date Range',
-            options=range(len(all_months)),
-            value=(0, len(all_months)-1),
-            format_func=lambda x: all_months[x]
-        )
-        
-        start_date = all_months[start_idx]
-        end_date = all_months[end_idx]
-            
-        # Create and display choropleth maps
-        fig_maps = create_choropleth_maps(df_end, df_covid_month, start_date, end_date)
-        st.plotly_chart(fig_maps, use_container_width=True)
+        _render_maps(df_end, df_covid_month, data_path)
     
     # Add data source information
     st.markdown("""
@@ -298,6 +471,9 @@ def main(data_path: str):
     """)
 
 if __name__ == "__main__":
+    import argparse
+    import sys
+
     parser = argparse.ArgumentParser(description='COVID-19 and Flight Volume Analysis Dashboard')
     parser.add_argument('--data_path', type=str, default='./data', required=False, help='Path to the data directory')
     